@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Context Packer for the Medical Q&A Model
+This module shrinks retrieved passages before they are sent to the LLM:
+near-duplicate passages are dropped, long passages are trimmed to the
+sentences most similar to the question, and the remainder is packed into a
+token budget in relevance order.
+"""
+
+import re
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, Set
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_PATTERN = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the LLM token count of text as words plus punctuation marks"""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text after its first max_tokens approximate tokens"""
+    for i, match in enumerate(_TOKEN_PATTERN.finditer(text)):
+        if i + 1 == max_tokens:
+            return text[:match.end()]
+    return text
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences on terminal punctuation"""
+    return [s.strip() for s in _SENTENCE_PATTERN.split(text) if s.strip()]
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    """Word shingles used for lexical near-duplicate detection"""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class ContextPacker:
+    def __init__(self, encoder=None, token_budget: int = 1200, dedup_threshold: float = 0.92,
+                 max_sentences: int = 4, lexical_dedup_threshold: float = 0.8):
+        """
+        Initialize the context packer
+
+        Args:
+            encoder: Optional encoder exposing ``encode(texts) -> np.ndarray``;
+                without one, deduplication and trimming fall back to word overlap
+            token_budget: Maximum approximate tokens of packed context
+            dedup_threshold: Cosine similarity above which a passage is a near-duplicate
+            max_sentences: Sentences kept from each passage
+            lexical_dedup_threshold: Shingle Jaccard similarity used when there is no encoder
+        """
+        self.encoder = encoder
+        self.token_budget = token_budget
+        self.dedup_threshold = dedup_threshold
+        self.max_sentences = max_sentences
+        self.lexical_dedup_threshold = lexical_dedup_threshold
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into unit-length vectors"""
+        embeddings = np.asarray(self.encoder.encode(texts), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.clip(norms, 1e-12, None)
+
+    def _deduplicate(self, passages: List[str], embeddings: Optional[np.ndarray]) -> List[int]:
+        """Return the indices of passages kept after dropping near-duplicates of earlier ones"""
+        kept: List[int] = []
+        if embeddings is not None:
+            for i in range(len(passages)):
+                if not kept or float(np.max(embeddings[kept] @ embeddings[i])) < self.dedup_threshold:
+                    kept.append(i)
+            return kept
+
+        shingles = [_shingles(p) for p in passages]
+        for i in range(len(passages)):
+            duplicate = any(
+                len(shingles[i] & shingles[j]) / max(len(shingles[i] | shingles[j]), 1)
+                >= self.lexical_dedup_threshold
+                for j in kept
+            )
+            if not duplicate:
+                kept.append(i)
+        return kept
+
+    def _trim(self, question: str, question_embedding: Optional[np.ndarray],
+              passages: List[str]) -> List[str]:
+        """Keep the sentences of each passage most similar to the question, in original order"""
+        sentence_lists = [split_sentences(p) for p in passages]
+        long_ids = [i for i, sentences in enumerate(sentence_lists) if len(sentences) > self.max_sentences]
+        if not long_ids:
+            return passages
+
+        all_sentences = [s for i in long_ids for s in sentence_lists[i]]
+        if question_embedding is not None:
+            # One batched encode for the sentences of every passage that needs trimming
+            scores = self._embed(all_sentences) @ question_embedding
+        else:
+            question_words = set(re.findall(r"\w+", question.lower()))
+            scores = np.array([len(question_words & set(re.findall(r"\w+", s.lower())))
+                               for s in all_sentences], dtype=np.float32)
+
+        trimmed = list(passages)
+        offset = 0
+        for i in long_ids:
+            sentences = sentence_lists[i]
+            passage_scores = scores[offset:offset + len(sentences)]
+            offset += len(sentences)
+            keep = sorted(np.argsort(-passage_scores, kind='stable')[:self.max_sentences])
+            trimmed[i] = ' '.join(sentences[j] for j in keep)
+        return trimmed
+
+    def pack(self, question: str, passages: List[str]) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Deduplicate, trim and budget retrieved passages
+
+        Args:
+            question: The input question
+            passages: Retrieved passages in relevance order
+
+        Returns:
+            Tuple of the packed passages (still in relevance order) and packing statistics
+        """
+        passages = [p.strip() for p in passages if p and p.strip()]
+        stats = {
+            "passages_retrieved": len(passages),
+            "tokens_retrieved": sum(estimate_tokens(p) for p in passages),
+        }
+        if not passages:
+            stats.update({"passages_packed": 0, "context_tokens": 0})
+            return [], stats
+
+        question_embedding = None
+        passage_embeddings = None
+        if self.encoder is not None:
+            try:
+                embeddings = self._embed([question] + passages)
+                question_embedding, passage_embeddings = embeddings[0], embeddings[1:]
+            except Exception as e:
+                logger.warning(f"Context embedding failed, using lexical packing: {e}")
+
+        kept = self._deduplicate(passages, passage_embeddings)
+        stats["duplicates_removed"] = len(passages) - len(kept)
+
+        trimmed = self._trim(question, question_embedding, [passages[i] for i in kept])
+
+        packed, used = [], 0
+        for passage in trimmed:
+            tokens = estimate_tokens(passage)
+            if used + tokens > self.token_budget:
+                if packed:
+                    # A later, shorter passage may still fit
+                    continue
+                # Never drop the most relevant passage entirely
+                passage = truncate_tokens(passage, self.token_budget)
+                tokens = estimate_tokens(passage)
+            packed.append(passage)
+            used += tokens
+
+        stats.update({"passages_packed": len(packed), "context_tokens": used})
+        return packed, stats
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Request deadline helpers shared by the Medical AI models
+Deadlines are absolute ``time.monotonic()`` timestamps propagated from the
+model service so that expired work is skipped before encoding or LLM calls.
+Work shared by coalesced requests carries a SharedDeadline instead, which is
+extended as later callers join and is accepted wherever a deadline is.
+"""
+
+import time
+from typing import Optional, Union
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before a processing stage starts"""
+
+
+class SharedDeadline:
+    """Deadline of work shared by several callers: the latest of their deadlines"""
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.at = deadline
+
+    def extend(self, deadline: Optional[float]):
+        """Push the deadline out to cover a caller joining with the given deadline"""
+        if self.at is not None:
+            self.at = None if deadline is None else max(self.at, deadline)
+
+
+Deadline = Union[float, SharedDeadline, None]
+
+
+def remaining_time(deadline: Deadline) -> Optional[float]:
+    """Seconds left until the deadline, or None when there is no deadline"""
+    if isinstance(deadline, SharedDeadline):
+        deadline = deadline.at
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline(deadline: Deadline, stage: str):
+    """
+    Raise DeadlineExceeded if the deadline has passed
+
+    Args:
+        deadline: Absolute time.monotonic() deadline, SharedDeadline, or None for no deadline
+        stage: Name of the stage about to run, used in the error message
+    """
+    remaining = remaining_time(deadline)
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {stage}")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Encoder Parity Check
+This module compares an ONNX encoder backend against the PyTorch backend on a
+sample set: embedding cosine similarity, FAISS retrieval top-k overlap and
+encode latency.
+"""
+
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import faiss
+import logging
+
+from encoders import load_encoder
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLES = [
+    "What are the symptoms of diabetes?",
+    "How is hypertension treated?",
+    "What causes migraine headaches?",
+    "Side effects of ibuprofen",
+    "fever, headache, nausea",
+    "chest pain and shortness of breath",
+    "Is it safe to take acetaminophen during pregnancy?",
+    "What is the difference between a cold and the flu?",
+]
+
+
+def _time_encode(encoder, texts: List[str], repeats: int) -> Dict[str, float]:
+    """Measure single-query encode latency in milliseconds"""
+    encoder.encode(texts[:1])  # warm up
+    timings = []
+    for _ in range(repeats):
+        for text in texts:
+            start = time.perf_counter()
+            encoder.encode([text])
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "mean_ms": float(np.mean(timings)),
+    }
+
+
+def check_parity(samples: List[str], candidate_backend: str = 'onnx-int8',
+                 index_path: Optional[str] = None, top_k: int = 5,
+                 repeats: int = 3) -> Dict[str, Any]:
+    """
+    Compare a candidate encoder backend against the torch backend
+
+    Args:
+        samples: Texts to encode
+        candidate_backend: Backend to compare (onnx or onnx-int8)
+        index_path: Optional FAISS index used to compare retrieval results
+        top_k: Number of neighbours compared per query
+        repeats: Latency measurement passes over the sample set
+
+    Returns:
+        Dictionary containing parity and latency metrics
+    """
+    reference = load_encoder('torch')
+    candidate = load_encoder(candidate_backend)
+
+    ref_emb = reference.encode(samples)
+    cand_emb = candidate.encode(samples)
+
+    ref_norm = ref_emb / np.linalg.norm(ref_emb, axis=1, keepdims=True)
+    cand_norm = cand_emb / np.linalg.norm(cand_emb, axis=1, keepdims=True)
+    cosines = (ref_norm * cand_norm).sum(axis=1)
+
+    report = {
+        "candidate_backend": candidate_backend,
+        "samples": len(samples),
+        "embedding_cosine": {
+            "min": float(cosines.min()),
+            "mean": float(cosines.mean()),
+        },
+        "latency": {
+            "torch": _time_encode(reference, samples, repeats),
+            candidate_backend: _time_encode(candidate, samples, repeats),
+        },
+    }
+
+    if index_path and Path(index_path).exists():
+        index = faiss.read_index(str(index_path))
+        _, ref_ids = index.search(ref_emb, top_k)
+        _, cand_ids = index.search(cand_emb, top_k)
+        overlaps = [len(set(r) & set(c)) / top_k for r, c in zip(ref_ids, cand_ids)]
+        top1 = [r[0] == c[0] for r, c in zip(ref_ids, cand_ids)]
+        report["retrieval"] = {
+            "index": str(index_path),
+            "top_k": top_k,
+            "mean_overlap_at_k": float(np.mean(overlaps)),
+            "top1_agreement": float(np.mean(top1)),
+        }
+    elif index_path:
+        logger.warning(f"FAISS index not found at {index_path}, skipping retrieval parity")
+
+    return report
+
+
+def main():
+    """
+    Main function for running the parity check
+    """
+    parser = argparse.ArgumentParser(description="Compare an ONNX encoder against the torch encoder")
+    parser.add_argument('--backend', default='onnx-int8', choices=['onnx', 'onnx-int8'])
+    parser.add_argument('--samples', help="File with one sample text per line")
+    parser.add_argument('--index', default='embeddings/faiss_index_cpu.index',
+                        help="FAISS index used for the retrieval comparison")
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    samples = DEFAULT_SAMPLES
+    if args.samples:
+        with open(args.samples, encoding='utf-8') as f:
+            samples = [line.strip() for line in f if line.strip()]
+
+    try:
+        report = check_parity(samples, args.backend, args.index, args.top_k, args.repeats)
+        print(json.dumps(report, indent=2))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, indent=2))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Query encoder backends for the Medical AI models
+This module provides interchangeable sentence encoders for MiniLM embeddings:
+the full-precision PyTorch SentenceTransformer and an exported ONNX
+(optionally int8-quantized) model run through ONNX Runtime on CPU.
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import List, Optional
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+DEFAULT_ONNX_DIR = 'onnx/all-MiniLM-L6-v2'
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_INT8_MODEL_FILE = 'model.int8.onnx'
+TOKENIZER_FILE = 'tokenizer.json'
+
+ENCODER_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+
+class TorchEncoder:
+    """Full-precision PyTorch encoder backed by SentenceTransformer"""
+
+    backend = 'torch'
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME):
+        # Imported lazily so the ONNX backend never pulls in the torch runtime
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Encode texts into embeddings
+
+        Args:
+            texts: List of texts to encode
+            batch_size: Number of texts encoded per forward pass
+
+        Returns:
+            Float32 array of shape (len(texts), dim)
+        """
+        embeddings = self.model.encode(texts, batch_size=batch_size)
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+class OnnxEncoder:
+    """CPU encoder running an exported MiniLM graph with ONNX Runtime"""
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, quantized: bool = False,
+                 max_length: int = 256, num_threads: Optional[int] = None):
+        """
+        Initialize the ONNX encoder
+
+        Args:
+            model_dir: Directory produced by ``python encoders.py export``
+            quantized: Use the dynamically int8-quantized graph
+            max_length: Maximum number of tokens per text
+            num_threads: Intra-op threads for ONNX Runtime (defaults to the runtime's choice)
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.backend = 'onnx-int8' if quantized else 'onnx'
+        model_dir = Path(model_dir)
+        model_path = model_dir / (ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        self.model_name = str(model_path)
+        tokenizer_path = model_dir / TOKENIZER_FILE
+        if not model_path.exists() or not tokenizer_path.exists():
+            raise FileNotFoundError(
+                f"ONNX encoder files not found in {model_dir}. "
+                f"Run 'python encoders.py export --output {model_dir}' first."
+            )
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Encode texts into embeddings
+
+        Mirrors the SentenceTransformer pipeline: mean pooling over the
+        attention mask followed by L2 normalization.
+
+        Args:
+            texts: List of texts to encode
+            batch_size: Number of texts encoded per forward pass
+
+        Returns:
+            Float32 array of shape (len(texts), dim)
+        """
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+            feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if 'token_type_ids' in self.input_names:
+                feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            batches.append(pooled / np.clip(norms, 1e-12, None))
+
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(batches).astype(np.float32)
+
+
+def load_encoder(backend: Optional[str] = None, onnx_dir: Optional[str] = None):
+    """
+    Load the configured query encoder
+
+    Args:
+        backend: One of ``torch``, ``onnx`` or ``onnx-int8``
+            (defaults to the ENCODER_BACKEND environment variable, then ``torch``)
+        onnx_dir: Directory holding the exported ONNX model
+            (defaults to the ONNX_ENCODER_DIR environment variable)
+
+    Returns:
+        An encoder exposing ``encode(texts) -> np.ndarray``
+    """
+    backend = (backend or os.getenv('ENCODER_BACKEND') or 'torch').lower()
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}")
+
+    if backend == 'torch':
+        logger.info("Loading sentence transformer model...")
+        return TorchEncoder()
+
+    onnx_dir = onnx_dir or os.getenv('ONNX_ENCODER_DIR', DEFAULT_ONNX_DIR)
+    logger.info(f"Loading {backend} encoder from {onnx_dir}")
+    threads = os.getenv('ONNX_NUM_THREADS')
+    return OnnxEncoder(onnx_dir, quantized=(backend == 'onnx-int8'),
+                       num_threads=int(threads) if threads else None)
+
+
+def export_onnx(output_dir: str, model_name: str = DEFAULT_MODEL_NAME, quantize: bool = True):
+    """
+    Export MiniLM to ONNX and optionally write a dynamically int8-quantized copy
+
+    Exporting needs torch and transformers; serving the result only needs
+    onnxruntime and tokenizers.
+
+    Args:
+        output_dir: Directory to write the model and tokenizer files to
+        model_name: Hugging Face model to export
+        quantize: Also write the int8-quantized graph
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    # The fast tokenizer writes the tokenizer.json used at serving time
+    tokenizer.save_pretrained(str(output_dir))
+
+    sample = tokenizer(["example medical query"], return_tensors='pt')
+    input_names = ['input_ids', 'attention_mask', 'token_type_ids']
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    model_path = output_dir / ONNX_MODEL_FILE
+    logger.info(f"Exporting {model_name} to {model_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample['input_ids'], sample['attention_mask'], sample['token_type_ids']),
+            str(model_path),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        int8_path = output_dir / ONNX_INT8_MODEL_FILE
+        logger.info(f"Writing int8-quantized model to {int8_path}")
+        quantize_dynamic(str(model_path), str(int8_path), weight_type=QuantType.QInt8)
+
+
+def main():
+    """
+    Main function for exporting the ONNX encoder
+    """
+    parser = argparse.ArgumentParser(description="Export MiniLM for the ONNX encoder backend")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Export the encoder to ONNX")
+    export_parser.add_argument('--output', default=DEFAULT_ONNX_DIR, help="Output directory")
+    export_parser.add_argument('--model', default=DEFAULT_MODEL_NAME, help="Model to export")
+    export_parser.add_argument('--no-quantize', action='store_true', help="Skip the int8 model")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'export':
+            export_onnx(args.output, model_name=args.model, quantize=not args.no_quantize)
+            print(json.dumps({"status": "exported", "output": args.output}, indent=2))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, indent=2))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
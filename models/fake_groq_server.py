@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Fake Groq Chat Completions Server
+This module serves a local stand-in for the Groq chat-completions API with
+configurable latency, token pacing and error injection, so the model service
+can be exercised offline. Point the Groq client at it with GROQ_BASE_URL.
+"""
+
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COMPLETIONS_PATH = '/openai/v1/chat/completions'
+
+CANNED_ANSWER = (
+    "Based on the provided context, this condition is usually managed with a combination of "
+    "lifestyle measures and medication chosen by a clinician. Common considerations include "
+    "the patient's history, possible drug interactions and side effects. Please consult a "
+    "qualified healthcare professional for advice specific to your situation."
+)
+
+
+class FakeGroqServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 300.0,
+                 jitter_ms: float = 100.0, token_interval_ms: float = 5.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, seed: Optional[int] = None):
+        """
+        Initialize the fake server
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency_ms: Mean delay before the first token
+            jitter_ms: Uniform jitter added to or removed from the first-token delay
+            token_interval_ms: Delay between generated tokens
+            error_rate: Fraction of requests answered with HTTP 500
+            rate_limit_rate: Fraction of requests answered with HTTP 429
+            seed: Seed for latency and error injection
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_interval_ms = token_interval_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.first_token_delays: List[float] = []
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Fake Groq server listening on {self.base_url}")
+
+    def stop(self):
+        """Stop serving and release the socket"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request counts and first-token delay percentiles
+
+        The delays are the injected latency as applied by this server, not a
+        client-observed time-to-first-token.
+        """
+        with self._lock:
+            delays = list(self.first_token_delays)
+            stats = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited,
+            }
+        if delays:
+            stats["first_token_delay_ms"] = {
+                "p50": float(np.percentile(delays, 50)),
+                "p95": float(np.percentile(delays, 95)),
+                "p99": float(np.percentile(delays, 99)),
+            }
+        return stats
+
+    def _next_outcome(self) -> Tuple[str, float]:
+        """Decide how to answer the next request and how long to wait before the first token"""
+        with self._lock:
+            self.requests += 1
+            roll = self.random.random()
+            if roll < self.error_rate:
+                self.errors += 1
+                return 'error', 0.0
+            if roll < self.error_rate + self.rate_limit_rate:
+                self.rate_limited += 1
+                return 'rate_limited', 0.0
+            delay_ms = max(self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms), 0.0)
+        return 'ok', delay_ms
+
+    def _record_first_token_delay(self, delay_ms: float):
+        with self._lock:
+            self.first_token_delays.append(delay_ms)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up, e.g. its deadline expired
+                    self.close_connection = True
+
+            def do_GET(self):
+                if self.path == '/stats':
+                    self._send_json(200, server.get_stats())
+                else:
+                    self._send_json(404, {"error": {"message": "Not found", "type": "not_found"}})
+
+            def do_POST(self):
+                received = time.perf_counter()
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}})
+                    return
+
+                if self.path != COMPLETIONS_PATH:
+                    self._send_json(404, {"error": {"message": "Not found", "type": "not_found"}})
+                    return
+
+                outcome, delay_ms = server._next_outcome()
+                if outcome == 'error':
+                    self._send_json(500, {"error": {"message": "Injected server error", "type": "internal_server_error"}})
+                    return
+                if outcome == 'rate_limited':
+                    self._send_json(429, {"error": {"message": "Injected rate limit", "type": "rate_limit_exceeded"}})
+                    return
+
+                time.sleep(delay_ms / 1000)
+                server._record_first_token_delay((time.perf_counter() - received) * 1000)
+
+                prompt = ' '.join(str(m.get('content', '')) for m in request.get('messages', []))
+                tokens = CANNED_ANSWER.split(' ')
+                tokens = tokens[:request.get('max_tokens') or len(tokens)]
+                usage = {
+                    "prompt_tokens": len(prompt.split()),
+                    "completion_tokens": len(tokens),
+                    "total_tokens": len(prompt.split()) + len(tokens),
+                }
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                model = request.get('model', 'fake-model')
+
+                if request.get('stream'):
+                    self._stream(completion_id, model, tokens)
+                    return
+
+                time.sleep(len(tokens) * server.token_interval_ms / 1000)
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": ' '.join(tokens)},
+                        "logprobs": None,
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                })
+
+            def _stream(self, completion_id: str, model: str, tokens: List[str]):
+                self.close_connection = True
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/event-stream')
+                    self.send_header('Connection', 'close')
+                    self.end_headers()
+
+                    for i, token in enumerate(tokens):
+                        if i:
+                            time.sleep(server.token_interval_ms / 1000)
+                        chunk = {
+                            "id": completion_id,
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": model,
+                            "choices": [{
+                                "index": 0,
+                                "delta": {"content": token if i == 0 else ' ' + token},
+                                "finish_reason": "stop" if i == len(tokens) - 1 else None,
+                            }],
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up mid-stream; drop the rest of the response
+                    pass
+
+        return Handler
+
+
+def main():
+    """
+    Main function for running the fake server standalone
+    """
+    parser = argparse.ArgumentParser(description="Run a local fake Groq chat-completions server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency-ms', type=float, default=300.0)
+    parser.add_argument('--jitter-ms', type=float, default=100.0)
+    parser.add_argument('--token-interval-ms', type=float, default=5.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    server = FakeGroqServer(args.host, args.port, args.latency_ms, args.jitter_ms,
+                            args.token_interval_ms, args.error_rate, args.rate_limit_rate, args.seed)
+    print(f"Fake Groq server listening on {server.base_url} (set GROQ_BASE_URL to this URL)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Knowledge Graph Entity Linker
+This module links extracted medical entities onto knowledge graph nodes using
+an exact-match token index backed by a FAISS nearest-neighbour index over
+embeddings of the node names and labels.
+"""
+
+import re
+import json
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import faiss
+import networkx as nx
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Node attributes treated as names for a node, in addition to the node id
+LABEL_ATTRIBUTES = ('label', 'name', 'title')
+
+INDEX_FILE = 'kg_node_index.faiss'
+LABELS_FILE = 'kg_node_labels.json'
+
+
+def normalize_label(text: str) -> str:
+    """Lowercase text and collapse punctuation and whitespace"""
+    return re.sub(r'[^a-z0-9]+', ' ', str(text).lower()).strip()
+
+
+class KnowledgeGraphLinker:
+    def __init__(self, graph: nx.Graph, encoder, threshold: float = 0.65, top_k: int = 3,
+                 cache_dir: Optional[str] = None):
+        """
+        Build the entity linker for a knowledge graph
+
+        Args:
+            graph: Medical knowledge graph
+            encoder: Encoder exposing ``encode(texts) -> np.ndarray``
+            threshold: Minimum cosine similarity for an embedding match
+            top_k: Nearest labels considered per entity
+            cache_dir: Optional directory to persist the label embedding index in
+        """
+        self.encoder = encoder
+        self.threshold = threshold
+        self.top_k = top_k
+
+        # Parallel lists: one entry per (node, label) pair
+        self.labels: List[str] = []
+        self.label_nodes: List[Any] = []
+        self.token_index: Dict[str, List[Any]] = {}
+
+        for node, data in graph.nodes(data=True):
+            names = [node] + [data[attr] for attr in LABEL_ATTRIBUTES if data.get(attr)]
+            for name in dict.fromkeys(normalize_label(n) for n in names):
+                if not name:
+                    continue
+                self.labels.append(name)
+                self.label_nodes.append(node)
+                self.token_index.setdefault(name, []).append(node)
+
+        self.index = self._load_or_build_index(Path(cache_dir) if cache_dir else None)
+        logger.info(f"Knowledge graph linker ready with {len(self.labels)} node labels")
+
+    def _index_metadata(self, dim: int) -> Dict[str, Any]:
+        """Describe the labels and encoder a label index was built from"""
+        return {
+            "encoder_backend": getattr(self.encoder, 'backend', type(self.encoder).__name__),
+            "encoder_model": getattr(self.encoder, 'model_name', None),
+            "dim": dim,
+            "labels": self.labels,
+        }
+
+    def _load_or_build_index(self, cache_dir: Optional[Path]) -> Optional[faiss.Index]:
+        """Load the persisted label index if it matches the graph and encoder, otherwise embed the labels"""
+        if not self.labels:
+            # Nothing to embed; link() leaves every entity unmatched
+            return None
+
+        if cache_dir is not None:
+            index_path = cache_dir / INDEX_FILE
+            labels_path = cache_dir / LABELS_FILE
+            if index_path.exists() and labels_path.exists():
+                with open(labels_path, encoding='utf-8') as f:
+                    cached = json.load(f)
+                # Vectors from another backend or model are not comparable with this encoder's queries
+                expected = self._index_metadata(self._encode(self.labels[:1]).shape[1])
+                if cached == expected:
+                    index = faiss.read_index(str(index_path))
+                    if index.d == expected["dim"] and index.ntotal == len(self.labels):
+                        logger.info(f"Loading knowledge graph label index from {index_path}")
+                        return index
+                logger.info("Persisted knowledge graph label index is stale, rebuilding")
+
+        logger.info(f"Embedding {len(self.labels)} knowledge graph labels...")
+        embeddings = self._encode(self.labels)
+        index = faiss.IndexFlatIP(embeddings.shape[1])
+        index.add(embeddings)
+
+        if cache_dir is not None:
+            try:
+                faiss.write_index(index, str(cache_dir / INDEX_FILE))
+                with open(cache_dir / LABELS_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(self._index_metadata(embeddings.shape[1]), f)
+            except OSError as e:
+                logger.warning(f"Could not persist knowledge graph label index: {e}")
+
+        return index
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into unit-length float32 vectors for inner-product search"""
+        embeddings = np.ascontiguousarray(self.encoder.encode(texts), dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def link(self, entities: List[str]) -> Dict[str, List[Any]]:
+        """
+        Link entities onto knowledge graph nodes
+
+        Exact label matches are resolved from the token index; the remaining
+        entities are embedded together and resolved with one batched search.
+
+        Args:
+            entities: List of medical entities
+
+        Returns:
+            Mapping of each entity to its matched nodes (empty when unmatched)
+        """
+        links: Dict[str, List[Any]] = {}
+        unresolved = []
+        for entity in dict.fromkeys(entities):
+            exact = self.token_index.get(normalize_label(entity))
+            if exact:
+                links[entity] = list(exact)
+            else:
+                links[entity] = []
+                unresolved.append(entity)
+
+        if unresolved and self.labels:
+            scores, ids = self.index.search(self._encode(unresolved), min(self.top_k, len(self.labels)))
+            for entity, entity_scores, entity_ids in zip(unresolved, scores, ids):
+                nodes = [self.label_nodes[i] for score, i in zip(entity_scores, entity_ids)
+                         if i >= 0 and score >= self.threshold]
+                links[entity] = list(dict.fromkeys(nodes))
+
+        return links
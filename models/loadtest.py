@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Load Testing Harness for the Model Service
+This module drives handle_qa_request and handle_recommendation_request at a
+configurable request rate and concurrency against a bundled fake Groq server,
+and reports throughput, latency percentiles, error rates and LLM call
+attempts versus caller-visible LLM failures. The service does not stream
+completions, so QA latency covers the full answer rather than the first token.
+
+Runs offline on a CPU-only machine as long as the query encoder is available
+locally: either a cached sentence-transformers model or an exported ONNX
+encoder selected with ENCODER_BACKEND=onnx (see encoders.py).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import logging
+
+from fake_groq_server import FakeGroqServer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUESTIONS = [
+    "What are the symptoms of diabetes?",
+    "How is hypertension treated?",
+    "What causes migraine headaches?",
+    "What are the side effects of ibuprofen?",
+    "How does insulin work?",
+    "What is the difference between a cold and the flu?",
+    "Is it safe to take acetaminophen during pregnancy?",
+    "What are the early signs of a stroke?",
+]
+
+DEFAULT_SYMPTOMS = [
+    ["fever", "headache"],
+    ["cough", "sore throat"],
+    ["nausea", "vomiting"],
+    ["chest pain", "shortness of breath"],
+    ["rash", "itching"],
+    ["joint pain", "swelling"],
+    ["fatigue", "dizziness"],
+    ["high blood pressure"],
+]
+
+
+def _load_lines(path: Optional[str]) -> Optional[List[str]]:
+    """Read non-empty lines from a corpus file"""
+    if not path:
+        return None
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _classify(result: Dict[str, Any]) -> str:
+    """Map a service response onto an outcome bucket"""
+    if result.get('overloaded'):
+        return 'overloaded'
+    if result.get('timed_out'):
+        return 'timed_out'
+    if result.get('llm_error'):
+        return 'llm_error'
+    if result.get('error'):
+        return 'error'
+    return 'ok'
+
+
+def _summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Summarize the samples of one request kind"""
+    latencies = [s['latency_ms'] for s in samples]
+    outcomes = {}
+    for s in samples:
+        outcomes[s['outcome']] = outcomes.get(s['outcome'], 0) + 1
+
+    summary = {
+        "requests": len(samples),
+        "throughput_rps": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "outcomes": outcomes,
+        "error_rate": (len(samples) - outcomes.get('ok', 0)) / len(samples) if samples else 0.0,
+    }
+    if latencies:
+        summary["latency_ms"] = {
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "p99": float(np.percentile(latencies, 99)),
+            "max": float(np.max(latencies)),
+        }
+    return summary
+
+
+class LoadGenerator:
+    def __init__(self, mode: str = 'mixed', rate: float = 10.0, concurrency: int = 16,
+                 total_requests: int = 200, questions: Optional[List[str]] = None,
+                 symptoms: Optional[List[List[str]]] = None, timeout: Optional[float] = None,
+                 seed: Optional[int] = None):
+        """
+        Initialize the load generator
+
+        Args:
+            mode: Request mix: qa, recommend or mixed
+            rate: Target arrival rate in requests per second (0 for closed-loop)
+            concurrency: Maximum requests in flight
+            total_requests: Number of requests to send
+            questions: Question corpus for QA requests
+            symptoms: Symptom list corpus for recommendation requests
+            timeout: Optional per-request timeout forwarded to the service
+            seed: Seed for request selection
+        """
+        self.mode = mode
+        self.rate = rate
+        self.concurrency = concurrency
+        self.total_requests = total_requests
+        self.questions = questions or DEFAULT_QUESTIONS
+        self.symptoms = symptoms or DEFAULT_SYMPTOMS
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.samples: List[Dict[str, Any]] = []
+
+    def _next_request(self):
+        """Pick the next request kind and payload"""
+        kind = self.mode if self.mode != 'mixed' else self.random.choice(['qa', 'recommend'])
+        if kind == 'qa':
+            payload = {"question": self.random.choice(self.questions)}
+        else:
+            payload = {"symptoms": list(self.random.choice(self.symptoms))}
+        if self.timeout:
+            payload["timeout"] = self.timeout
+        return kind, payload
+
+    async def _send(self, service, kind: str, payload: Dict[str, Any], scheduled: float,
+                    semaphore: asyncio.Semaphore):
+        """Send one request, holding a concurrency slot, and record its latency"""
+        try:
+            if kind == 'qa':
+                result = await service.handle_qa_request(payload)
+            else:
+                result = await service.handle_recommendation_request(payload)
+            outcome = _classify(result)
+        except Exception as e:
+            logger.error(f"Request failed: {e}")
+            outcome = 'exception'
+        finally:
+            semaphore.release()
+        self.samples.append({
+            "kind": kind,
+            "outcome": outcome,
+            # Measured from the scheduled send time so waiting for a
+            # concurrency slot counts towards latency
+            "latency_ms": (time.perf_counter() - scheduled) * 1000,
+        })
+
+    async def run(self, service) -> float:
+        """
+        Send all requests
+
+        Args:
+            service: The model_service module
+
+        Returns:
+            Elapsed wall-clock seconds
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        tasks = []
+        for i in range(self.total_requests):
+            if self.rate > 0:
+                # Open loop: requests are due on a fixed schedule regardless of completions
+                scheduled = start + i / self.rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            # The slot is released by _send when the request completes
+            await semaphore.acquire()
+            if self.rate <= 0:
+                # Closed loop: the next request starts as soon as a slot frees up
+                scheduled = time.perf_counter()
+            kind, payload = self._next_request()
+            tasks.append(asyncio.ensure_future(self._send(service, kind, payload, scheduled, semaphore)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """Build the load test report"""
+        report = {
+            "mode": self.mode,
+            "target_rate_rps": self.rate,
+            "concurrency": self.concurrency,
+            "elapsed_s": elapsed,
+            "overall": _summarize(self.samples, elapsed),
+        }
+        for kind in ('qa', 'recommend'):
+            samples = [s for s in self.samples if s['kind'] == kind]
+            if samples:
+                report[kind] = _summarize(samples, elapsed)
+        return report
+
+
+async def run_load_test(args) -> Dict[str, Any]:
+    """Start the fake LLM, load the model service and drive it with load"""
+    fake_llm = None
+    if not args.external_llm:
+        fake_llm = FakeGroqServer(
+            latency_ms=args.llm_latency_ms,
+            jitter_ms=args.llm_jitter_ms,
+            token_interval_ms=args.llm_token_interval_ms,
+            error_rate=args.llm_error_rate,
+            rate_limit_rate=args.llm_rate_limit_rate,
+            seed=args.seed,
+        )
+        fake_llm.start()
+        os.environ['GROQ_BASE_URL'] = fake_llm.base_url
+        os.environ['GROQ_API_KEY'] = 'fake-load-test-key'
+    # Client retries would otherwise hide injected failures from the service
+    os.environ['GROQ_MAX_RETRIES'] = str(args.llm_max_retries)
+
+    # Never reach out to the model hub during a load test
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+    # Imported late so the service picks up the fake LLM settings
+    sys.path.append(str(Path(__file__).parent))
+    import model_service
+
+    questions = _load_lines(args.questions)
+    symptom_lines = _load_lines(args.symptoms)
+    symptoms = None
+    if symptom_lines:
+        symptoms = [[s.strip() for s in line.split(',') if s.strip()] for line in symptom_lines]
+
+    generator = LoadGenerator(
+        mode=args.mode,
+        rate=args.rate,
+        concurrency=args.concurrency,
+        total_requests=args.requests,
+        questions=questions,
+        symptoms=symptoms,
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+
+    try:
+        elapsed = await generator.run(model_service)
+        report = generator.report(elapsed)
+        report["service"] = model_service.handle_health_check()
+        if fake_llm:
+            stats = fake_llm.get_stats()
+            report["llm"] = {
+                "max_retries": args.llm_max_retries,
+                "attempts": stats["requests"],
+                "injected_errors": stats["errors"],
+                "injected_rate_limits": stats["rate_limited"],
+                "caller_visible_failures": sum(1 for s in generator.samples if s['outcome'] == 'llm_error'),
+            }
+            if "first_token_delay_ms" in stats:
+                report["llm"]["configured_first_token_delay_ms"] = stats["first_token_delay_ms"]
+        return report
+    finally:
+        model_service.model_service.shutdown()
+        if fake_llm:
+            fake_llm.stop()
+
+
+def main():
+    """
+    Main function for running a load test
+    """
+    parser = argparse.ArgumentParser(description="Load test the model service against a fake Groq server")
+    parser.add_argument('--mode', default='mixed', choices=['qa', 'recommend', 'mixed'])
+    parser.add_argument('--rate', type=float, default=10.0,
+                        help="Target requests per second (0 for closed-loop at full concurrency)")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help="Total requests to send")
+    parser.add_argument('--timeout', type=float, help="Per-request timeout in seconds")
+    parser.add_argument('--questions', help="File with one question per line")
+    parser.add_argument('--symptoms', help="File with one comma-separated symptom list per line")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--llm-latency-ms', type=float, default=300.0)
+    parser.add_argument('--llm-jitter-ms', type=float, default=100.0)
+    parser.add_argument('--llm-token-interval-ms', type=float, default=5.0)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--llm-max-retries', type=int, default=0,
+                        help="Groq client retries per LLM call (GROQ_MAX_RETRIES)")
+    parser.add_argument('--external-llm', action='store_true',
+                        help="Use GROQ_BASE_URL/GROQ_API_KEY from the environment instead of the fake server")
+    args = parser.parse_args()
+
+    try:
+        report = asyncio.run(run_load_test(args))
+        print(json.dumps(report, indent=2))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, indent=2))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
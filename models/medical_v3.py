@@ -13,7 +13,6 @@ import pandas as pd
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 import faiss
-from sentence_transformers import SentenceTransformer
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import networkx as nx
@@ -22,28 +21,40 @@ import logging
 import pickle
 from scipy import sparse
 
+from encoders import load_encoder
+from kg_linker import KnowledgeGraphLinker
+from deadlines import Deadline, DeadlineExceeded, check_deadline
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class MedicalRecommendationModel:
-    def __init__(self, data_dir: str = "kg_rag_artifacts"):
+    def __init__(self, data_dir: str = "kg_rag_artifacts", encoder_backend: Optional[str] = None):
         """
         Initialize the Medical Recommendation Model
         
         Args:
             data_dir: Directory containing knowledge graph RAG artifacts
+            encoder_backend: Query encoder backend (torch, onnx or onnx-int8);
+                defaults to the ENCODER_BACKEND environment variable
         """
         self.data_dir = Path(data_dir)
+        self.encoder_backend = encoder_backend
         self.model = None
         self.index = None
         self.corpus_embeddings = None
         self.tfidf_vectorizer = None
         self.tfidf_matrix = None
         self.medical_kg = None
+        self.kg_linker = None
         self.ner_entities = None
         self.kmeans_labels = None
         
+        # Lookup structures built lazily on first use and shared across queries
+        self._ner_vocabulary = None
+        self._drug_text = None
+        
         # Load drug side effects data
         self.drugs_data = self._load_drugs_data()
         
@@ -75,9 +86,8 @@ class MedicalRecommendationModel:
     def _load_components(self):
         """Load all required components for the recommendation system"""
         try:
-            # Load sentence transformer model
-            logger.info("Loading sentence transformer model...")
-            self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+            # Load query encoder
+            self.model = load_encoder(self.encoder_backend)
             
             # Load FAISS index
             index_path = self.data_dir / "faiss.index"
@@ -109,6 +119,7 @@ class MedicalRecommendationModel:
             if kg_path.exists():
                 logger.info(f"Loading medical knowledge graph from {kg_path}")
                 self.medical_kg = nx.read_graphml(str(kg_path))
+                self._build_kg_linker()
             
             # Load NER entities
             ner_path = self.data_dir / "ner_entities.csv"
@@ -126,6 +137,16 @@ class MedicalRecommendationModel:
             logger.error(f"Error loading components: {e}")
             # Continue with partial loading
     
+    def _get_ner_vocabulary(self) -> List[str]:
+        """Return the unique lowercased NER entity strings, built once"""
+        if self._ner_vocabulary is None:
+            vocabulary = []
+            if self.ner_entities is not None and \
+               'entity' in self.ner_entities.columns and 'label' in self.ner_entities.columns:
+                vocabulary = self.ner_entities['entity'].astype(str).str.lower().unique().tolist()
+            self._ner_vocabulary = vocabulary
+        return self._ner_vocabulary
+    
     def _extract_medical_entities(self, symptoms: List[str]) -> List[str]:
         """
         Extract medical entities from symptoms using NER data
@@ -136,25 +157,93 @@ class MedicalRecommendationModel:
         Returns:
             List of recognized medical entities
         """
-        entities = []
-        if self.ner_entities is not None:
+        return self._extract_medical_entities_many([symptoms])[0]
+    
+    def _extract_medical_entities_many(self, symptom_lists: List[List[str]]) -> List[List[str]]:
+        """
+        Extract medical entities for several symptom lists against one shared vocabulary
+        
+        Args:
+            symptom_lists: List of symptom lists
+            
+        Returns:
+            List of recognized medical entities per symptom list
+        """
+        vocabulary = self._get_ner_vocabulary()
+        entity_lists = []
+        for symptoms in symptom_lists:
             symptoms_text = ' '.join(symptoms).lower()
+            entities = [entity for entity in vocabulary if entity in symptoms_text]
+            entity_lists.append(list(set(entities)))  # Remove duplicates
+        
+        return entity_lists
+    
+    def _build_kg_linker(self):
+        """Build the embedding index used to link entities onto knowledge graph nodes"""
+        if self.medical_kg is None or self.model is None:
+            return
+        try:
+            threshold = float(os.getenv('KG_LINK_THRESHOLD', '0.65'))
+            self.kg_linker = KnowledgeGraphLinker(
+                self.medical_kg, self.model, threshold=threshold, cache_dir=str(self.data_dir)
+            )
+        except Exception as e:
+            logger.warning(f"Knowledge graph linker unavailable, falling back to substring matching: {e}")
+            self.kg_linker = None
+    
+    def _match_kg_nodes(self, entity: str) -> List[Any]:
+        """
+        Find knowledge graph nodes by substring matching on node data
+        
+        Args:
+            entity: Medical entity
             
-            # Look for entities in the NER data
-            for _, row in self.ner_entities.iterrows():
-                if 'entity' in row and 'label' in row:
-                    entity = str(row['entity']).lower()
-                    if entity in symptoms_text:
-                        entities.append(entity)
-        
-        return list(set(entities))  # Remove duplicates
+        Returns:
+            List of matching nodes
+        """
+        nodes = []
+        for node in self.medical_kg.nodes():
+            node_data = self.medical_kg.nodes[node]
+            if entity.lower() in str(node).lower() or \
+               (isinstance(node_data, dict) and 
+                any(entity.lower() in str(v).lower() for v in node_data.values())):
+                nodes.append(node)
+        
+        return nodes
+    
+    def _resolve_kg_concepts(self, entities: List[str], concept_cache: Dict[str, List[str]]):
+        """
+        Link entities missing from the cache onto the knowledge graph and cache their neighbours
+        
+        Args:
+            entities: List of medical entities
+            concept_cache: Per-entity related concepts, updated in place
+        """
+        missing = [entity for entity in dict.fromkeys(entities) if entity not in concept_cache]
+        if not missing:
+            return
+        
+        if self.kg_linker is not None:
+            links = self.kg_linker.link(missing)
+        else:
+            links = {entity: self._match_kg_nodes(entity) for entity in missing}
+        
+        for entity in missing:
+            concepts = []
+            for node in links.get(entity, []):
+                # Get neighbors of this node
+                neighbors = list(self.medical_kg.neighbors(node))
+                concepts.extend([str(n) for n in neighbors[:5]])  # Limit to 5
+            concept_cache[entity] = concepts
     
-    def _search_knowledge_graph(self, entities: List[str]) -> List[str]:
+    def _search_knowledge_graph(self, entities: List[str],
+                                concept_cache: Optional[Dict[str, List[str]]] = None) -> List[str]:
         """
         Search the knowledge graph for related medical concepts
         
         Args:
             entities: List of medical entities
+            concept_cache: Optional per-entity results shared across queries in a batch
             
         Returns:
             List of related medical concepts
@@ -162,23 +251,80 @@ class MedicalRecommendationModel:
         related_concepts = []
         
         if self.medical_kg is not None:
+            if concept_cache is None:
+                concept_cache = {}
             try:
+                self._resolve_kg_concepts(entities, concept_cache)
                 for entity in entities:
-                    # Find nodes that match the entity
-                    for node in self.medical_kg.nodes():
-                        node_data = self.medical_kg.nodes[node]
-                        if entity.lower() in str(node).lower() or \
-                           (isinstance(node_data, dict) and 
-                            any(entity.lower() in str(v).lower() for v in node_data.values())):
-                            
-                            # Get neighbors of this node
-                            neighbors = list(self.medical_kg.neighbors(node))
-                            related_concepts.extend([str(n) for n in neighbors[:5]])  # Limit to 5
+                    related_concepts.extend(concept_cache.get(entity, []))
             except Exception as e:
                 logger.warning(f"Error searching knowledge graph: {e}")
         
         return list(set(related_concepts))[:10]  # Return top 10 unique concepts
     
+    def _get_drug_text(self) -> Optional[Tuple[pd.Series, Optional[pd.Series]]]:
+        """Return the lowercased indication and drug name text per drug, built once"""
+        if self._drug_text is None and self.drugs_data is not None \
+           and 'indication' in self.drugs_data.columns:
+            # str() per value like the per-row loop did, so missing values read 'nan'
+            # rather than becoming NaN under pandas' string dtype
+            indication = self.drugs_data['indication'].astype(object).map(str).str.lower()
+            drug_name = None
+            if 'drug_name' in self.drugs_data.columns:
+                drug_name = self.drugs_data['drug_name'].astype(object).map(str).str.lower()
+            self._drug_text = (indication, drug_name)
+        return self._drug_text
+    
+    def _score_drugs_many(self, symptom_lists: List[List[str]]) -> Optional[sparse.csr_matrix]:
+        """
+        Count matching symptoms for every query against every drug
+        
+        Builds a sparse query x term matrix over the unique symptom terms of
+        the batch and a sparse term x drug incidence matrix (one vectorized
+        scan of the drug table per unique term), so the counts for the whole
+        batch come from a single sparse matrix product.
+        
+        Args:
+            symptom_lists: List of symptom lists
+            
+        Returns:
+            Sparse (queries x drugs) matrix of matched symptom counts
+        """
+        drug_text = self._get_drug_text()
+        if drug_text is None:
+            return None
+        indication, drug_name = drug_text
+        
+        term_ids: Dict[str, int] = {}
+        rows, cols = [], []
+        for query_idx, symptoms in enumerate(symptom_lists):
+            for symptom in symptoms:
+                term = symptom.lower().strip()
+                rows.append(query_idx)
+                cols.append(term_ids.setdefault(term, len(term_ids)))
+        
+        # Repeated symptoms within a query are summed, matching the per-symptom count
+        query_terms = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=(len(symptom_lists), len(term_ids))
+        )
+        
+        term_rows, drug_cols = [], []
+        for term, term_idx in term_ids.items():
+            matches = indication.str.contains(term, regex=False)
+            if drug_name is not None:
+                matches = matches | drug_name.str.contains(term, regex=False)
+            hits = np.flatnonzero(matches.to_numpy(dtype=bool))
+            term_rows.extend([term_idx] * len(hits))
+            drug_cols.extend(hits.tolist())
+        
+        term_drugs = sparse.csr_matrix(
+            (np.ones(len(term_rows)), (term_rows, drug_cols)),
+            shape=(len(term_ids), len(indication))
+        )
+        
+        return (query_terms @ term_drugs).tocsr()
+    
     def _semantic_search_drugs(self, symptoms: List[str], top_k: int = 10) -> List[Dict[str, Any]]:
         """
         Search for drugs using semantic similarity
@@ -190,43 +336,47 @@ class MedicalRecommendationModel:
         Returns:
             List of drug recommendations with scores
         """
-        recommendations = []
+        return self._semantic_search_drugs_many([symptoms], top_k)[0]
+    
+    def _semantic_search_drugs_many(self, symptom_lists: List[List[str]],
+                                    top_k: int = 10) -> List[List[Dict[str, Any]]]:
+        """
+        Search for drugs for several symptom lists at once
+        
+        Args:
+            symptom_lists: List of symptom lists
+            top_k: Number of top results to return per symptom list
+            
+        Returns:
+            List of drug recommendations with scores per symptom list
+        """
+        recommendations = [[] for _ in symptom_lists]
         
         if self.drugs_data is None:
             return recommendations
         
         try:
-            # Combine symptoms into query text
-            query_text = ' '.join(symptoms).lower()
+            counts = self._score_drugs_many(symptom_lists)
+            if counts is None:
+                return recommendations
             
-            # Search in drug indications
-            if 'indication' in self.drugs_data.columns:
-                # Simple text matching for now (can be enhanced with embeddings)
-                matches = []
-                for idx, row in self.drugs_data.iterrows():
-                    indication = str(row.get('indication', '')).lower()
-                    drug_name = str(row.get('drug_name', '')).lower()
-                    
-                    # Calculate simple text similarity
-                    similarity = 0
-                    for symptom in symptoms:
-                        symptom = symptom.lower().strip()
-                        if symptom in indication or symptom in drug_name:
-                            similarity += 1
-                    
-                    if similarity > 0:
-                        matches.append({
-                            'drug_name': row.get('drug_name', 'Unknown'),
-                            'indication': row.get('indication', 'N/A'),
-                            'side_effects': row.get('side_effects', 'N/A'),
-                            'score': similarity / len(symptoms),
-                            'dosage': row.get('dosage', 'Consult physician'),
-                            'route': row.get('route', 'As prescribed')
-                        })
+            for query_idx, symptoms in enumerate(symptom_lists):
+                row = counts.getrow(query_idx)
+                if row.nnz == 0:
+                    continue
                 
-                # Sort by similarity score
-                matches.sort(key=lambda x: x['score'], reverse=True)
-                recommendations = matches[:top_k]
+                # Highest score first, ties kept in drug table order
+                order = np.lexsort((row.indices, -row.data))[:top_k]
+                for pos in order:
+                    drug = self.drugs_data.iloc[row.indices[pos]]
+                    recommendations[query_idx].append({
+                        'drug_name': drug.get('drug_name', 'Unknown'),
+                        'indication': drug.get('indication', 'N/A'),
+                        'side_effects': drug.get('side_effects', 'N/A'),
+                        'score': float(row.data[pos]) / len(symptoms),
+                        'dosage': drug.get('dosage', 'Consult physician'),
+                        'route': drug.get('route', 'As prescribed')
+                    })
         
         except Exception as e:
             logger.error(f"Error in semantic search: {e}")
@@ -262,13 +412,41 @@ class MedicalRecommendationModel:
         
         return recommendations
     
-    def recommend(self, symptoms: List[str], additional_info: Optional[str] = None) -> Dict[str, Any]:
+    def _build_result(self, recommendations: List[Dict[str, Any]], entities: List[str],
+                      related_concepts: List[str]) -> Dict[str, Any]:
+        """Assemble the recommendation response for one symptom list"""
+        return {
+            "medications": recommendations,
+            "extracted_entities": entities,
+            "related_concepts": related_concepts,
+            "total_found": len(recommendations),
+            "disclaimer": (
+                "🏥 MEDICAL DISCLAIMER: These recommendations are for educational purposes only. "
+                "Always consult with qualified healthcare professionals before taking any medication. "
+                "Self-medication can be dangerous and may lead to adverse effects."
+            ),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _build_error_result(self, error: Exception) -> Dict[str, Any]:
+        """Assemble the error response for one symptom list"""
+        return {
+            "medications": [],
+            "error": str(error),
+            "disclaimer": "An error occurred while processing your request. Please consult a healthcare professional.",
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def recommend(self, symptoms: List[str], additional_info: Optional[str] = None,
+                  deadline: Deadline = None) -> Dict[str, Any]:
         """
         Main method to generate medicine recommendations
         
         Args:
             symptoms: List of symptoms
             additional_info: Additional medical information
+            deadline: Optional time.monotonic() deadline or SharedDeadline; raises DeadlineExceeded
+                instead of starting entity linking once it has passed
             
         Returns:
             Dictionary containing recommendations and metadata
@@ -277,9 +455,11 @@ class MedicalRecommendationModel:
         
         try:
             # Extract medical entities
+            check_deadline(deadline, "entity extraction")
             entities = self._extract_medical_entities(symptoms)
             
             # Search knowledge graph for related concepts
+            check_deadline(deadline, "knowledge graph linking")
             related_concepts = self._search_knowledge_graph(entities)
             
             # Perform semantic search for drug recommendations
@@ -288,30 +468,58 @@ class MedicalRecommendationModel:
             # Add safety warnings
             recommendations = self._add_safety_warnings(recommendations)
             
-            # Prepare result
-            result = {
-                "medications": recommendations,
-                "extracted_entities": entities,
-                "related_concepts": related_concepts,
-                "total_found": len(recommendations),
-                "disclaimer": (
-                    "🏥 MEDICAL DISCLAIMER: These recommendations are for educational purposes only. "
-                    "Always consult with qualified healthcare professionals before taking any medication. "
-                    "Self-medication can be dangerous and may lead to adverse effects."
-                ),
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            return result
+            return self._build_result(recommendations, entities, related_concepts)
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error generating recommendations: {e}")
-            return {
-                "medications": [],
-                "error": str(e),
-                "disclaimer": "An error occurred while processing your request. Please consult a healthcare professional.",
-                "timestamp": datetime.now().isoformat()
-            }
+            return self._build_error_result(e)
+    
+    def recommend_many(self, symptom_lists: List[List[str]],
+                       deadline: Deadline = None) -> List[Dict[str, Any]]:
+        """
+        Generate medicine recommendations for many symptom lists in one pass
+        
+        Entity extraction uses one shared vocabulary, all entities in the
+        batch are linked onto the knowledge graph together, and all drug
+        scores come from one sparse matrix product.
+        
+        Args:
+            symptom_lists: List of symptom lists
+            deadline: Optional time.monotonic() deadline or SharedDeadline; raises DeadlineExceeded
+                instead of starting entity linking once it has passed
+            
+        Returns:
+            List of result dictionaries, one per symptom list, in input order
+        """
+        logger.info(f"Processing batch of {len(symptom_lists)} symptom lists")
+        
+        try:
+            check_deadline(deadline, "entity extraction")
+            entity_lists = self._extract_medical_entities_many(symptom_lists)
+            
+            # Link every entity in the batch with one lookup before assembling per-query concepts
+            check_deadline(deadline, "knowledge graph linking")
+            concept_cache: Dict[str, List[str]] = {}
+            if self.medical_kg is not None:
+                self._resolve_kg_concepts([e for entities in entity_lists for e in entities], concept_cache)
+            related_lists = [self._search_knowledge_graph(entities, concept_cache)
+                             for entities in entity_lists]
+            
+            recommendation_lists = self._semantic_search_drugs_many(symptom_lists)
+            
+            return [
+                self._build_result(self._add_safety_warnings(recommendations), entities, related_concepts)
+                for recommendations, entities, related_concepts
+                in zip(recommendation_lists, entity_lists, related_lists)
+            ]
+            
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating batch recommendations: {e}")
+            return [self._build_error_result(e) for _ in symptom_lists]
 
 def main():
     """
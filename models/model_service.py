@@ -8,15 +8,22 @@ and can be called from the TypeScript backend.
 import os
 import sys
 import json
+import copy
+import math
+import time
 import asyncio
+import threading
+import functools
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Hashable
 import logging
 from concurrent.futures import ThreadPoolExecutor
 
 # Add the current directory to Python path
 sys.path.append(str(Path(__file__).parent))
 
+from deadlines import DeadlineExceeded, SharedDeadline, Deadline, check_deadline, remaining_time
+
 try:
     from qa import MedicalQAModel
     from medical_v3 import MedicalRecommendationModel
@@ -29,12 +36,260 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class ModelService:
+def _normalize_text(text: Optional[str]) -> str:
+    """Lowercase text and collapse whitespace for request deduplication"""
+    return ' '.join(str(text).lower().split()) if text else ''
+
+def _parse_timeout(value: Any) -> Optional[float]:
+    """
+    Validate a request timeout in seconds
+    
+    Args:
+        value: Raw timeout from the request payload (number or numeric string)
+        
+    Returns:
+        The timeout as a positive float, or None when not provided
+        
+    Raises:
+        ValueError: If the timeout is not a positive, finite number
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError("timeout must be a positive number of seconds")
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("timeout must be a positive number of seconds")
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise ValueError("timeout must be a positive number of seconds")
+    return timeout
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one shared computation"""
+    
     def __init__(self):
-        """Initialize the model service with both QA and Recommendation models"""
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._deadlines: Dict[Hashable, SharedDeadline] = {}
+        self.executed = 0
+        self.coalesced = 0
+    
+    async def do(self, key: Hashable, fn: Callable[[SharedDeadline], Awaitable[Dict[str, Any]]],
+                 deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run fn for key, or wait for the in-flight call with the same key
+        
+        The shared computation runs until the latest deadline among its
+        callers, while each caller stops waiting at its own deadline.
+        
+        Args:
+            key: Normalized request payload
+            fn: Coroutine function computing the result under the shared deadline
+            deadline: Optional time.monotonic() deadline of this caller
+            
+        Returns:
+            The shared result (followers receive their own copy)
+            
+        Raises:
+            DeadlineExceeded: If the caller's deadline passes while waiting
+        """
+        while True:
+            task = self._inflight.get(key)
+            follower = task is not None and not task.done()
+            if follower:
+                self._deadlines[key].extend(deadline)
+            else:
+                shared_deadline = SharedDeadline(deadline)
+                task = asyncio.ensure_future(fn(shared_deadline))
+                self._inflight[key] = task
+                self._deadlines[key] = shared_deadline
+                task.add_done_callback(functools.partial(self._forget, key))
+                self.executed += 1
+            
+            try:
+                # Shielded so a caller giving up does not cancel the other waiters
+                result = await asyncio.wait_for(asyncio.shield(task), remaining_time(deadline))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("Deadline exceeded while waiting for a coalesced request")
+            except DeadlineExceeded:
+                # The shared work expired just before this caller joined; go again
+                # while the caller still has time left
+                remaining = remaining_time(deadline)
+                if remaining is None or remaining <= 0:
+                    raise
+                continue
+            
+            if follower:
+                self.coalesced += 1
+                return copy.deepcopy(result)
+            return result
+    
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._deadlines[key]
+        if not task.cancelled():
+            # Retrieve the exception in case every caller stopped waiting
+            task.exception()
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get coalescing metrics"""
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced
+        }
+
+class ServiceOverloaded(Exception):
+    """Raised when a model's executor and queue are full"""
+
+class ModelLane:
+    """Dedicated executor with bounded admission for a single model"""
+    
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        """
+        Initialize the lane
+        
+        Args:
+            name: Model name used for thread names and errors
+            max_workers: Number of worker threads
+            max_queue: Number of requests allowed to wait for a free worker
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        
+        # Counters are updated from worker threads as well as the event loop
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+    
+    async def run(self, fn: Callable[[], Any], deadline: Deadline = None) -> Any:
+        """
+        Run fn on the lane's executor
+        
+        Args:
+            fn: Zero-argument callable to run in a worker thread
+            deadline: Optional time.monotonic() deadline or SharedDeadline for the request
+            
+        Returns:
+            The callable's result
+            
+        Raises:
+            ServiceOverloaded: If all workers are busy and the queue is full
+            DeadlineExceeded: If the deadline passes before the result is ready
+        """
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ServiceOverloaded(f"{self.name} queue is full")
+            self.pending += 1
+        
+        future = self.executor.submit(self._call, fn, deadline)
+        future.add_done_callback(self._release)
+        result = asyncio.wrap_future(future)
+        
+        try:
+            while True:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(result), remaining_time(deadline))
+                except asyncio.TimeoutError:
+                    # A shared deadline may have been extended while waiting
+                    if remaining_time(deadline) <= 0:
+                        break
+        except DeadlineExceeded:
+            # Shed inside the worker or the model before encoding or the LLM call
+            with self._lock:
+                self.expired += 1
+            raise
+        
+        # Cancelling drops the request if it is still queued
+        result.cancel()
+        with self._lock:
+            self.expired += 1
+        raise DeadlineExceeded(f"{self.name} request deadline exceeded")
+    
+    def _call(self, fn: Callable[[], Any], deadline: Deadline) -> Any:
+        """Run fn in a worker thread unless the request expired while queued"""
+        check_deadline(deadline, f"{self.name} execution")
+        with self._lock:
+            self.running += 1
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self.running -= 1
+    
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+            if not future.cancelled() and future.exception() is None:
+                self.completed += 1
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get queue depth and admission metrics"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "expired": self.expired
+            }
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+class ModelService:
+    def __init__(self, qa_workers: Optional[int] = None, qa_queue: Optional[int] = None,
+                 recommendation_workers: Optional[int] = None, recommendation_queue: Optional[int] = None,
+                 qa_timeout: Optional[float] = None, recommendation_timeout: Optional[float] = None,
+                 recommendation_batch_timeout: Optional[float] = None):
+        """
+        Initialize the model service with both QA and Recommendation models
+        
+        Each model gets its own executor and bounded queue so that slow
+        LLM-backed QA calls cannot starve recommendations. Unset limits are
+        read from the environment.
+        
+        Args:
+            qa_workers: Worker threads for QA (QA_MAX_WORKERS, default 2)
+            qa_queue: Queued QA requests allowed (QA_MAX_QUEUE, default 8)
+            recommendation_workers: Worker threads for recommendations (RECOMMENDATION_MAX_WORKERS, default 2)
+            recommendation_queue: Queued recommendation requests allowed (RECOMMENDATION_MAX_QUEUE, default 32)
+            qa_timeout: Default QA deadline in seconds (QA_TIMEOUT_S, default 30)
+            recommendation_timeout: Default recommendation deadline in seconds (RECOMMENDATION_TIMEOUT_S, default 10)
+            recommendation_batch_timeout: Default batch recommendation deadline in seconds
+                (RECOMMENDATION_BATCH_TIMEOUT_S, default 30)
+        """
         self.qa_model = None
         self.recommendation_model = None
-        self.executor = ThreadPoolExecutor(max_workers=2)
+        
+        self.qa_lane = ModelLane(
+            "qa",
+            qa_workers or int(os.getenv('QA_MAX_WORKERS', '2')),
+            qa_queue if qa_queue is not None else int(os.getenv('QA_MAX_QUEUE', '8'))
+        )
+        self.recommendation_lane = ModelLane(
+            "recommendation",
+            recommendation_workers or int(os.getenv('RECOMMENDATION_MAX_WORKERS', '2')),
+            recommendation_queue if recommendation_queue is not None
+            else int(os.getenv('RECOMMENDATION_MAX_QUEUE', '32'))
+        )
+        self.qa_timeout = qa_timeout or float(os.getenv('QA_TIMEOUT_S', '30'))
+        self.recommendation_timeout = recommendation_timeout or float(os.getenv('RECOMMENDATION_TIMEOUT_S', '10'))
+        self.recommendation_batch_timeout = recommendation_batch_timeout or \
+            float(os.getenv('RECOMMENDATION_BATCH_TIMEOUT_S', '30'))
+        
+        # Identical concurrent requests share one computation
+        self.qa_flight = SingleFlight()
+        self.recommendation_flight = SingleFlight()
         
         self._initialize_models()
     
@@ -60,7 +315,7 @@ class ModelService:
         except Exception as e:
             logger.error(f"Failed to initialize Recommendation model: {e}")
     
-    async def query_qa_model(self, question: str) -> Dict[str, Any]:
+    async def query_qa_model(self, question: str, timeout: Optional[float] = None) -> Dict[str, Any]:
         """Query the Medical Q&A model asynchronously"""
         if not self.qa_model:
             return {
@@ -69,15 +324,30 @@ class ModelService:
                 "sources": []
             }
         
+        deadline = time.monotonic() + (timeout if timeout is not None else self.qa_timeout)
+        try:
+            return await self.qa_flight.do(
+                _normalize_text(question),
+                lambda shared_deadline: self._run_qa_query(question, shared_deadline),
+                deadline
+            )
+        except DeadlineExceeded as e:
+            logger.warning(f"QA request expired: {e}")
+            return self._qa_expired_result()
+    
+    async def _run_qa_query(self, question: str, deadline: SharedDeadline) -> Dict[str, Any]:
+        """Run a single Q&A query on the QA executor, raising DeadlineExceeded if it expires"""
         try:
-            # Run the synchronous model query in a thread pool
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                self.executor, 
-                self.qa_model.query, 
-                question
+            result = await self.qa_lane.run(
+                functools.partial(self.qa_model.query, question, deadline=deadline),
+                deadline
             )
             return result
+        except ServiceOverloaded as e:
+            logger.warning(f"Rejecting QA request: {e}")
+            return self._qa_overloaded_result()
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error querying QA model: {e}")
             return {
@@ -86,7 +356,8 @@ class ModelService:
                 "sources": []
             }
     
-    async def query_recommendation_model(self, symptoms: List[str], additional_info: Optional[str] = None) -> Dict[str, Any]:
+    async def query_recommendation_model(self, symptoms: List[str], additional_info: Optional[str] = None,
+                                         timeout: Optional[float] = None) -> Dict[str, Any]:
         """Query the Medical Recommendation model asynchronously"""
         if not self.recommendation_model:
             return {
@@ -95,16 +366,34 @@ class ModelService:
                 "disclaimer": "The Medicine Recommendation service is currently unavailable. Please consult a healthcare professional."
             }
         
+        deadline = time.monotonic() + (timeout if timeout is not None else self.recommendation_timeout)
+        key = (tuple(_normalize_text(s) for s in symptoms), _normalize_text(additional_info))
+        try:
+            return await self.recommendation_flight.do(
+                key,
+                lambda shared_deadline: self._run_recommendation_query(symptoms, additional_info,
+                                                                       shared_deadline),
+                deadline
+            )
+        except DeadlineExceeded as e:
+            logger.warning(f"Recommendation request expired: {e}")
+            return self._recommendation_expired_result()
+    
+    async def _run_recommendation_query(self, symptoms: List[str], additional_info: Optional[str],
+                                        deadline: SharedDeadline) -> Dict[str, Any]:
+        """Run a single recommendation query on the recommendation executor, raising DeadlineExceeded if it expires"""
         try:
-            # Run the synchronous model query in a thread pool
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                self.executor,
-                self.recommendation_model.recommend,
-                symptoms,
-                additional_info
+            result = await self.recommendation_lane.run(
+                functools.partial(self.recommendation_model.recommend, symptoms, additional_info,
+                                  deadline=deadline),
+                deadline
             )
             return result
+        except ServiceOverloaded as e:
+            logger.warning(f"Rejecting recommendation request: {e}")
+            return self._recommendation_overloaded_result()
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error querying Recommendation model: {e}")
             return {
@@ -113,18 +402,93 @@ class ModelService:
                 "disclaimer": "An error occurred while processing your request. Please consult a healthcare professional."
             }
     
+    async def query_recommendation_model_many(self, symptom_lists: List[List[str]],
+                                              timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Query the Medical Recommendation model with a batch of symptom lists asynchronously"""
+        if not self.recommendation_model:
+            return [{
+                "error": "Recommendation model not available",
+                "medications": [],
+                "disclaimer": "The Medicine Recommendation service is currently unavailable. Please consult a healthcare professional."
+            } for _ in symptom_lists]
+        
+        # A batch holds a recommendation worker for its whole run, so it is bounded too
+        deadline = time.monotonic() + (timeout if timeout is not None else self.recommendation_batch_timeout)
+        try:
+            # Run the whole batch as one job on the recommendation executor
+            result = await self.recommendation_lane.run(
+                functools.partial(self.recommendation_model.recommend_many, symptom_lists,
+                                  deadline=deadline),
+                deadline
+            )
+            return result
+        except ServiceOverloaded as e:
+            logger.warning(f"Rejecting batch recommendation request: {e}")
+            return [self._recommendation_overloaded_result() for _ in symptom_lists]
+        except DeadlineExceeded as e:
+            logger.warning(f"Batch recommendation request expired: {e}")
+            return [self._recommendation_expired_result() for _ in symptom_lists]
+        except Exception as e:
+            logger.error(f"Error querying Recommendation model: {e}")
+            return [{
+                "error": str(e),
+                "medications": [],
+                "disclaimer": "An error occurred while processing your request. Please consult a healthcare professional."
+            } for _ in symptom_lists]
+    
+    def _qa_overloaded_result(self) -> Dict[str, Any]:
+        return {
+            "error": "Service overloaded",
+            "overloaded": True,
+            "answer": "The Medical Q&A service is busy. Please try again shortly.",
+            "sources": []
+        }
+    
+    def _qa_expired_result(self) -> Dict[str, Any]:
+        return {
+            "error": "Request deadline exceeded",
+            "timed_out": True,
+            "answer": "The Medical Q&A service took too long to respond. Please try again.",
+            "sources": []
+        }
+    
+    def _recommendation_overloaded_result(self) -> Dict[str, Any]:
+        return {
+            "error": "Service overloaded",
+            "overloaded": True,
+            "medications": [],
+            "disclaimer": "The Medicine Recommendation service is busy. Please try again shortly."
+        }
+    
+    def _recommendation_expired_result(self) -> Dict[str, Any]:
+        return {
+            "error": "Request deadline exceeded",
+            "timed_out": True,
+            "medications": [],
+            "disclaimer": "The Medicine Recommendation service took too long to respond. Please try again."
+        }
+    
     def get_health_status(self) -> Dict[str, Any]:
         """Get the health status of both models"""
         return {
             "qa_model": "loaded" if self.qa_model else "not loaded",
             "recommendation_model": "loaded" if self.recommendation_model else "not loaded",
-            "service_status": "healthy" if (self.qa_model and self.recommendation_model) else "partial"
+            "service_status": "healthy" if (self.qa_model and self.recommendation_model) else "partial",
+            "coalescing": {
+                "qa": self.qa_flight.get_stats(),
+                "recommendation": self.recommendation_flight.get_stats()
+            },
+            "queues": {
+                "qa": self.qa_lane.get_stats(),
+                "recommendation": self.recommendation_lane.get_stats()
+            }
         }
     
     def shutdown(self):
         """Shutdown the service and clean up resources"""
         logger.info("Shutting down model service...")
-        self.executor.shutdown(wait=True)
+        self.qa_lane.shutdown()
+        self.recommendation_lane.shutdown()
         logger.info("Model service shutdown complete")
 
 # Global service instance
@@ -140,7 +504,16 @@ async def handle_qa_request(data: Dict[str, Any]) -> Dict[str, Any]:
             "sources": []
         }
     
-    return await model_service.query_qa_model(question)
+    try:
+        timeout = _parse_timeout(data.get('timeout'))
+    except ValueError as e:
+        return {
+            "error": str(e),
+            "answer": "Please provide a valid timeout.",
+            "sources": []
+        }
+    
+    return await model_service.query_qa_model(question, timeout)
 
 async def handle_recommendation_request(data: Dict[str, Any]) -> Dict[str, Any]:
     """Handle recommendation requests"""
@@ -154,7 +527,40 @@ async def handle_recommendation_request(data: Dict[str, Any]) -> Dict[str, Any]:
             "disclaimer": "Please provide a list of symptoms."
         }
     
-    return await model_service.query_recommendation_model(symptoms, additional_info)
+    try:
+        timeout = _parse_timeout(data.get('timeout'))
+    except ValueError as e:
+        return {
+            "error": str(e),
+            "medications": [],
+            "disclaimer": "Please provide a valid timeout."
+        }
+    
+    return await model_service.query_recommendation_model(symptoms, additional_info, timeout)
+
+async def handle_batch_recommendation_request(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle batch recommendation requests"""
+    symptom_lists = data.get('symptom_lists', [])
+    
+    if not symptom_lists or not isinstance(symptom_lists, list) or \
+       not all(isinstance(symptoms, list) and symptoms for symptoms in symptom_lists):
+        return {
+            "error": "A list of non-empty symptom lists is required",
+            "results": [],
+            "disclaimer": "Please provide a list of symptom lists."
+        }
+    
+    try:
+        timeout = _parse_timeout(data.get('timeout'))
+    except ValueError as e:
+        return {
+            "error": str(e),
+            "results": [],
+            "disclaimer": "Please provide a valid timeout."
+        }
+    
+    results = await model_service.query_recommendation_model_many(symptom_lists, timeout)
+    return {"results": results, "total_queries": len(results)}
 
 def handle_health_check() -> Dict[str, Any]:
     """Handle health check requests"""
@@ -167,6 +573,7 @@ async def main():
         print("Commands:")
         print("  qa '<question>'")
         print("  recommend '<symptom1,symptom2,...>' [additional_info]")
+        print("  recommend-batch '<symptom1,symptom2;symptom3,...>' | <file with one symptom list per line>")
         print("  health")
         sys.exit(1)
     
@@ -197,6 +604,23 @@ async def main():
             })
             print(json.dumps(result, indent=2))
         
+        elif command == "recommend-batch":
+            if len(sys.argv) < 3:
+                print("Please provide symptom lists")
+                sys.exit(1)
+            
+            batch_arg = sys.argv[2]
+            if Path(batch_arg).is_file():
+                with open(batch_arg, encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+            else:
+                lines = batch_arg.split(';')
+            
+            symptom_lists = [[s.strip() for s in line.split(',') if s.strip()] for line in lines]
+            symptom_lists = [symptoms for symptoms in symptom_lists if symptoms]
+            result = await handle_batch_recommendation_request({"symptom_lists": symptom_lists})
+            print(json.dumps(result, indent=2))
+        
         elif command == "health":
             result = handle_health_check()
             print(json.dumps(result, indent=2))
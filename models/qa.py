@@ -12,28 +12,35 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 import faiss
 from groq import Groq
-from sentence_transformers import SentenceTransformer
 import pandas as pd
 from datetime import datetime
 import logging
 
+from encoders import load_encoder
+from deadlines import Deadline, check_deadline, remaining_time
+from context_packer import ContextPacker, estimate_tokens
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class MedicalQAModel:
-    def __init__(self, data_dir: str = "embeddings"):
+    def __init__(self, data_dir: str = "embeddings", encoder_backend: Optional[str] = None):
         """
         Initialize the Medical Q&A model
         
         Args:
             data_dir: Directory containing embeddings and FAISS index
+            encoder_backend: Query encoder backend (torch, onnx or onnx-int8);
+                defaults to the ENCODER_BACKEND environment variable
         """
         self.data_dir = Path(data_dir)
+        self.encoder_backend = encoder_backend
         self.model = None
         self.index = None
         self.documents = None
         self.groq_client = None
+        self.context_packer = None
         
         # Initialize components
         self._load_components()
@@ -41,9 +48,8 @@ class MedicalQAModel:
     def _load_components(self):
         """Load all required components for the QA system"""
         try:
-            # Load sentence transformer model
-            logger.info("Loading sentence transformer model...")
-            self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+            # Load query encoder
+            self.model = load_encoder(self.encoder_backend)
             
             # Load FAISS index
             index_path = self.data_dir / "faiss_index_cpu.index"
@@ -61,10 +67,20 @@ class MedicalQAModel:
             else:
                 logger.warning(f"Documents not found at {docs_path}")
             
+            # Initialize context packer
+            self.context_packer = ContextPacker(
+                self.model,
+                token_budget=int(os.getenv('QA_CONTEXT_TOKEN_BUDGET', '1200')),
+                dedup_threshold=float(os.getenv('QA_CONTEXT_DEDUP_THRESHOLD', '0.92'))
+            )
+            
             # Initialize Groq client
             groq_api_key = os.getenv('GROQ_API_KEY')
             if groq_api_key:
-                self.groq_client = Groq(api_key=groq_api_key)
+                self.groq_client = Groq(
+                    api_key=groq_api_key,
+                    max_retries=int(os.getenv('GROQ_MAX_RETRIES', '2'))
+                )
                 logger.info("Groq client initialized")
             else:
                 logger.warning("GROQ_API_KEY not found in environment variables")
@@ -99,7 +115,7 @@ class MedicalQAModel:
             # Extract relevant documents
             context_docs = []
             for i, idx in enumerate(indices[0]):
-                if idx < len(self.documents):
+                if 0 <= idx < len(self.documents):
                     doc = self.documents[idx]
                     if isinstance(doc, dict) and 'text' in doc:
                         context_docs.append(doc['text'])
@@ -114,30 +130,20 @@ class MedicalQAModel:
             logger.error(f"Error retrieving context: {e}")
             return []
     
-    def _generate_answer(self, question: str, context: List[str]) -> Dict[str, Any]:
+    def _build_prompt(self, question: str, context: List[str]) -> str:
         """
-        Generate answer using Groq API with retrieved context
+        Build the LLM prompt from the question and packed context
         
         Args:
             question: The input question
-            context: List of relevant context documents
+            context: List of packed context passages
             
         Returns:
-            Dictionary containing answer and metadata
+            Prompt text
         """
-        if not self.groq_client:
-            return {
-                "answer": "I apologize, but the AI service is not available at the moment. Please check the configuration.",
-                "confidence": 0.0,
-                "sources": context[:3] if context else []
-            }
+        context_text = "\n\n".join(context) if context else "No relevant context found."
         
-        try:
-            # Prepare context for the prompt
-            context_text = "\n\n".join(context[:3]) if context else "No relevant context found."
-            
-            # Create educational prompt
-            prompt = f"""
+        return f"""
 You are a knowledgeable medical AI assistant. Based on the provided medical context, please answer the following question accurately and educationally.
 
 IMPORTANT DISCLAIMERS:
@@ -158,9 +164,42 @@ Please provide a comprehensive, educational answer that includes:
 4. Recommendation to consult healthcare professionals
 
 Answer:"""
+    
+    def _generate_answer(self, question: str, context: List[str],
+                         deadline: Deadline = None) -> Dict[str, Any]:
+        """
+        Generate answer using Groq API with retrieved context
+        
+        Args:
+            question: The input question
+            context: List of packed context passages
+            deadline: Optional time.monotonic() deadline bounding the API call
+            
+        Returns:
+            Dictionary containing answer and metadata
+        """
+        prompt = self._build_prompt(question, context)
+        
+        if not self.groq_client:
+            return {
+                "answer": "I apologize, but the AI service is not available at the moment. Please check the configuration.",
+                "confidence": 0.0,
+                "sources": context,
+                "prompt_tokens": estimate_tokens(prompt),
+                "error": "LLM client not configured",
+                "llm_error": True
+            }
+        
+        try:
+            # Never wait on the API longer than the caller is willing to; the
+            # timeout applies per attempt, so retries would run past the deadline
+            client = self.groq_client
+            remaining = remaining_time(deadline)
+            if remaining is not None:
+                client = client.with_options(max_retries=0, timeout=max(remaining, 0.1))
             
             # Generate response using Groq
-            chat_completion = self.groq_client.chat.completions.create(
+            chat_completion = client.chat.completions.create(
                 messages=[
                     {
                         "role": "user",
@@ -174,10 +213,15 @@ Answer:"""
             
             answer = chat_completion.choices[0].message.content
             
+            # Prefer the API's own count, fall back to the local estimate
+            usage = getattr(chat_completion, "usage", None)
+            prompt_tokens = getattr(usage, "prompt_tokens", None) or estimate_tokens(prompt)
+            
             return {
                 "answer": answer,
                 "confidence": 0.85,  # Static confidence for now
-                "sources": context[:3] if context else [],
+                "sources": context,
+                "prompt_tokens": prompt_tokens,
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -186,26 +230,42 @@ Answer:"""
             return {
                 "answer": "I apologize, but I encountered an error while processing your question. Please try again or consult a healthcare professional.",
                 "confidence": 0.0,
-                "sources": context[:3] if context else []
+                "sources": context,
+                "prompt_tokens": estimate_tokens(prompt),
+                "error": str(e),
+                "llm_error": True
             }
     
-    def query(self, question: str) -> Dict[str, Any]:
+    def query(self, question: str, deadline: Deadline = None) -> Dict[str, Any]:
         """
         Main method to process a medical question
         
         Args:
             question: The input medical question
+            deadline: Optional time.monotonic() deadline or SharedDeadline; raises DeadlineExceeded
+                instead of starting retrieval or the LLM call once it has passed
             
         Returns:
             Dictionary containing answer, sources, and metadata
         """
         logger.info(f"Processing question: {question[:100]}...")
         
-        # Retrieve relevant context
-        context = self._retrieve_context(question)
+        # Retrieve relevant context; the packer decides how much of it is sent
+        check_deadline(deadline, "retrieval")
+        context = self._retrieve_context(question, top_k=10)
+        
+        # Deduplicate, trim and budget the context
+        check_deadline(deadline, "context packing")
+        packing = {}
+        if self.context_packer:
+            context, packing = self.context_packer.pack(question, context)
+        else:
+            context = context[:3]
         
         # Generate answer with context
-        result = self._generate_answer(question, context)
+        check_deadline(deadline, "answer generation")
+        result = self._generate_answer(question, context, deadline)
+        result["context_packing"] = packing
         
         # Add educational disclaimer
         educational_disclaimer = ("\n\n⚠️ **Medical Disclaimer**: This information is for educational purposes only. "
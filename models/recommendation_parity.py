@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Recommendation Scoring Parity Check
+This module compares the vectorized drug scoring of the recommendation model
+against the original per-row scan of the drug table, on sample symptom lists
+and on random terms drawn from the table itself.
+"""
+
+import sys
+import json
+import random
+import argparse
+import pandas as pd
+from typing import List, Dict, Any, Optional
+import logging
+
+from medical_v3 import MedicalRecommendationModel
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYMPTOMS = [
+    ["fever", "headache"],
+    ["cough", "sore throat"],
+    ["nausea", "vomiting"],
+    ["chest pain", "shortness of breath"],
+    ["rash", "itching"],
+    ["flu"],
+    ["pain", "pain"],
+    ["nan"],
+]
+
+
+def reference_search(drugs_data: pd.DataFrame, symptoms: List[str], top_k: int = 10) -> List[Dict[str, Any]]:
+    """Score drugs with the original per-row scan of the drug table"""
+    matches = []
+    if 'indication' not in drugs_data.columns:
+        return matches
+    for idx, row in drugs_data.iterrows():
+        indication = str(row.get('indication', '')).lower()
+        drug_name = str(row.get('drug_name', '')).lower()
+
+        similarity = 0
+        for symptom in symptoms:
+            symptom = symptom.lower().strip()
+            if symptom in indication or symptom in drug_name:
+                similarity += 1
+
+        if similarity > 0:
+            matches.append({
+                'drug_name': row.get('drug_name', 'Unknown'),
+                'indication': row.get('indication', 'N/A'),
+                'score': similarity / len(symptoms),
+            })
+
+    matches.sort(key=lambda x: x['score'], reverse=True)
+    return matches[:top_k]
+
+
+def random_symptom_lists(drugs_data: pd.DataFrame, count: int, seed: Optional[int] = None) -> List[List[str]]:
+    """
+    Draw symptom lists from the drug table text
+
+    Terms are whole words, short word fragments and the join of an indication's
+    tail with a drug name's head, so matches that must not span the two fields
+    are exercised too.
+    """
+    rng = random.Random(seed)
+    indications = drugs_data['indication'].astype(object).map(str).str.lower().tolist() \
+        if 'indication' in drugs_data.columns else ['']
+    names = drugs_data['drug_name'].astype(object).map(str).str.lower().tolist() \
+        if 'drug_name' in drugs_data.columns else ['']
+
+    def term() -> str:
+        kind = rng.random()
+        text = rng.choice(indications + names)
+        if kind < 0.4 and text.split():
+            return rng.choice(text.split())
+        if kind < 0.8 and text:
+            start = rng.randrange(len(text))
+            return text[start:start + rng.randint(2, 4)]
+        i = rng.randrange(len(indications))
+        return indications[i][-2:] + names[i][:2] if i < len(names) else 'nan'
+
+    return [[term() for _ in range(rng.randint(1, 3))] for _ in range(count)]
+
+
+def _ranking(recommendations: List[Dict[str, Any]]) -> List[tuple]:
+    # str() so missing values compare equal to each other
+    return [(str(r['drug_name']), str(r['indication']), r['score']) for r in recommendations]
+
+
+def check_parity(model: MedicalRecommendationModel, symptom_lists: List[List[str]],
+                 top_k: int = 10) -> Dict[str, Any]:
+    """
+    Compare the model's batch drug scoring against the per-row reference
+
+    Args:
+        model: Recommendation model with its drug table loaded
+        symptom_lists: Symptom lists to score
+        top_k: Number of recommendations compared per symptom list
+
+    Returns:
+        Dictionary with the number of mismatching top-k lists and examples
+    """
+    if model.drugs_data is None:
+        raise ValueError("Drug table not loaded")
+
+    batched = model._semantic_search_drugs_many(symptom_lists, top_k)
+    mismatches = []
+    for symptoms, candidate in zip(symptom_lists, batched):
+        expected = reference_search(model.drugs_data, symptoms, top_k)
+        if _ranking(candidate) != _ranking(expected):
+            mismatches.append({
+                "symptoms": symptoms,
+                "expected": _ranking(expected),
+                "actual": _ranking(candidate),
+            })
+
+    return {
+        "drugs": len(model.drugs_data),
+        "queries": len(symptom_lists),
+        "top_k": top_k,
+        "mismatches": len(mismatches),
+        "examples": mismatches[:5],
+    }
+
+
+def main():
+    """
+    Main function for running the parity check
+    """
+    parser = argparse.ArgumentParser(description="Compare batch drug scoring against the per-row scan")
+    parser.add_argument('--data-dir', default='kg_rag_artifacts')
+    parser.add_argument('--symptoms', help="File with one comma-separated symptom list per line")
+    parser.add_argument('--random', type=int, default=100, help="Random symptom lists drawn from the drug table")
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    symptom_lists = DEFAULT_SYMPTOMS
+    if args.symptoms:
+        with open(args.symptoms, encoding='utf-8') as f:
+            symptom_lists = [[s.strip() for s in line.split(',') if s.strip()] for line in f if line.strip()]
+
+    try:
+        model = MedicalRecommendationModel(data_dir=args.data_dir)
+        if model.drugs_data is not None:
+            symptom_lists = symptom_lists + random_symptom_lists(model.drugs_data, args.random, args.seed)
+        report = check_parity(model, symptom_lists, args.top_k)
+        print(json.dumps(report, indent=2))
+        if report["mismatches"]:
+            sys.exit(1)
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, indent=2))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()